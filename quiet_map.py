@@ -11,19 +11,45 @@ Features
 - 非賛否（meta）レーン（前提・定義・問い・補足・論点ずらし等）を別領域に配置
 - ノード右クリック：追加（接続詞ベース）/削除
 - ノードダブルクリック：簡易編集（接続詞＋本文）
-- JSON保存/読込
+- JSON保存/読込（読込時に整合性を検証し、問題があれば壊れたエッジ・循環・parent・列の修復を提案）
+- 部分木のコピー/貼り付け（Ctrl+C / Ctrl+V、別ファイル間も可）・JSON統合（別マップを区画として取り込み）
+- 差分比較（旧リビジョンとの差分を色分け）/ CLI: python quiet_map.py diff OLD.json NEW.json（またはフォルダ）
 - 整列（簡易オートレイアウト）
+- 大きなマップの整列・文章出力・検証はバックグラウンドで実行（操作は止まらない）
+- 検証 / CLI: python quiet_map.py check MAP.json [--repair -o OUT.json]
 - 初期化（サンプルに戻す）
+- 起動: python quiet_map.py [FILE.json]（FILE 指定時はサンプルを作らずに開く。読込はウィンドウ表示後）
 - Canvasズーム：Ctrl + マウスホイール
+- 全体図（縮小表示・クリックで移動。変更のあったノードだけ差分更新）
+- SVG出力（マップ全体）/ CLI: python quiet_map.py svg MAP.json OUT.svg（tkinter 不要）
+- 計測表示（F2）/ 計測値の JSON 保存（F3）/ cProfile の開始・停止と .prof 出力（F4）
 
-動作環境: Python 3.9+ / Tkinter
+動作環境: Python 3.9+ / Tkinter（CLI のサブコマンドは Tkinter なしでも動作）
 """
 
+import argparse
+import cProfile
+import functools
+import glob
 import json
 import math
+import os
+import queue
+import random
+import sys
+import threading
+import time
 import uuid
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from collections import Counter
+from concurrent.futures import Future
+from contextlib import contextmanager
+from xml.sax.saxutils import escape, quoteattr
+
+try:
+    import tkinter as tk
+    from tkinter import ttk, filedialog, messagebox
+except ImportError:  # CLI（diff / svg）は tkinter なしでも使える
+    tk = None
 
 # ---- Lane constants ----
 LANE_META = -1  # 非賛否
@@ -36,6 +62,7 @@ NODE_H_MIN = 70
 META_LEFT = 20
 META_W = 260
 GRID_Y = 18  # rough line height
+SECTION_GAP = 110  # 区画（JSON統合で取り込んだまとまり）どうしの間隔
 
 # ---- Connectors (接続詞) -> semantics for lane placement ----
 # mode:
@@ -74,6 +101,18 @@ ADD_CHOICES_MAIN = [
 ]
 ADD_CHOICES_META = ["定義として", "前提として", "問いとして", "補足として", "論点を変えて"]
 
+# これ以上のノード数では、整列・文章出力・検証をバックグラウンドで行う
+ASYNC_MIN_NODES = 2000
+
+# ---- Diff overlay colours (op -> fill) ----
+DIFF_COLORS = {
+    "added": "#e6ffed",
+    "text": "#fff8c5",
+    "connector": "#fff8c5",
+    "lane": "#ddf4ff",
+    "parent": "#fbefff",
+}
+
 
 def sample_map():
     """Built-in sample: Kinoko vs Takenoko (expanded a bit)."""
@@ -139,22 +178,1121 @@ def sample_map():
     return {"nodes": nodes, "edges": edges, "meta": {"title": "Kinoko vs Takenoko", "version": 1}}
 
 
-class QuietMapApp(tk.Tk):
+GEN_TEXT_JA = "きのこたけのこチョコとビスケットの比率が大事です。食感・味・思い出・価格も評価軸になります。なぜならしかしそれでも、議論は静かに続きます。"
+GEN_TEXT_EN = "the chocolate and biscuit ratio matters because texture taste and memories all count as reasons "
+
+
+def generate_map(n_nodes=1000, lane_depth=4, branching=3, text_len=(10, 60),
+                 meta_share=0.05, issue_shift_share=0.01, japanese=True, seed=None):
+    """ベンチマーク用の合成マップを生成する（戻り値は sample_map と同じ形）。
+
+    - lane_depth: 使う賛否列の数（0..lane_depth-1）
+    - branching: 1ノードあたりの子の上限
+    - text_len: 本文の長さ (min, max) の一様分布、または rng -> int の関数
+    - meta_share / issue_shift_share: 非賛否ノード / 論点を変えて ノードの割合
+    """
+    rng = random.Random(seed)
+    base = (GEN_TEXT_JA if japanese else GEN_TEXT_EN) * 40
+    if callable(text_len):
+        pick_len = text_len
+    else:
+        lo, hi = text_len
+
+        def pick_len(r):
+            return r.randint(lo, hi)
+
+    meta_conns = [c for c, (t, m) in CONNECTOR_TO_RULE.items() if m == "meta" and t != "issue_shift"]
+    same_conns = [c for c, (t, m) in CONNECTOR_TO_RULE.items() if m == "same" and t != "claim"]
+    next_conns = [c for c, (t, m) in CONNECTOR_TO_RULE.items() if m == "next"]
+
+    nodes = {}
+    edges = []
+    lane_y = {}
+    open_parents = []  # 子を付けられるノード（先頭から消費）
+    head = 0
+    child_count = {}
+
+    for i in range(n_nodes):
+        node_id = f"g{i:07d}"
+        length = max(0, pick_len(rng))
+        off = rng.randrange(0, len(base) - length) if length < len(base) else 0
+        text = base[off:off + length]
+
+        r = rng.random()
+        parent_id = ""
+        if r < issue_shift_share:
+            lane, conn = LANE_META, "論点を変えて"
+        elif r < issue_shift_share + meta_share:
+            lane, conn = LANE_META, rng.choice(meta_conns)
+        elif head >= len(open_parents):
+            lane, conn = 0, "主張として"
+        else:
+            parent_id = open_parents[head]
+            pl = int(nodes[parent_id]["lane"])
+            if pl + 1 < lane_depth and rng.random() < 0.4:
+                conn = rng.choice(next_conns)
+            else:
+                conn = rng.choice(same_conns)
+            lane = child_lane(pl, CONNECTOR_TO_RULE[conn][1])
+            child_count[parent_id] = child_count.get(parent_id, 0) + 1
+            if child_count[parent_id] >= branching:
+                head += 1
+
+        y = lane_y.get(lane, 60)
+        lane_y[lane] = y + 90
+        nodes[node_id] = {
+            "id": node_id,
+            "lane": lane,
+            "x": 0,
+            "y": y,
+            "connector": conn,
+            "type": CONNECTOR_TO_RULE[conn][0],
+            "text": text,
+            "parent": parent_id,
+        }
+        if parent_id:
+            edges.append({"source": parent_id, "target": node_id})
+        if lane != LANE_META and branching > 0:
+            open_parents.append(node_id)
+
+    return {"nodes": nodes, "edges": edges, "meta": {"title": "generated", "version": 1}}
+
+
+# ---- geometry (Tk 非依存。Canvas 描画と SVG 出力で共用) ----
+def lane_to_x(lane):
+    if lane == LANE_META:
+        return META_LEFT
+    return META_LEFT + META_W + GAP_X + lane * (LANE_W + GAP_X)
+
+
+def estimate_h(text):
+    s = (text or "").strip()
+    if not s:
+        return NODE_H_MIN
+    lines = max(1, math.ceil(len(s) / 26))
+    return NODE_H_MIN + (lines - 1) * GRID_Y
+
+
+def node_bbox(n):
+    x1 = lane_to_x(int(n["lane"]))
+    y1 = int(n["y"])
+    w = (META_W - 20) if int(n["lane"]) == LANE_META else NODE_W
+    h = max(NODE_H_MIN, estimate_h(n.get("text", "")))
+    return x1, y1, x1 + w, y1 + h
+
+
+def edge_points(a, b):
+    """ノード a -> b の矢印の折れ線（x1, y1, midx, y1, midx, y2, x2, y2）。"""
+    ax1, ay1, ax2, ay2 = node_bbox(a)
+    bx1, by1, bx2, by2 = node_bbox(b)
+    x1 = ax2
+    y1 = (ay1 + ay2) / 2
+    x2 = bx1
+    y2 = (by1 + by2) / 2
+    midx = (x1 + x2) / 2
+    return x1, y1, midx, y1, midx, y2, x2, y2
+
+
+# ---- performance instrumentation ----
+class PerfStats:
+    """処理ごとの所要時間（ms）と、任意の計測値（canvas アイテム数など）を記録する。
+
+    ワーカースレッドからも記録されるので、読む側は snapshot() を使う。
+    """
+
     def __init__(self):
+        self.sections = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, ms):
+        with self._lock:
+            st = self.sections.get(name)
+            if st is None:
+                st = self.sections[name] = {"count": 0, "total_ms": 0.0, "last_ms": 0.0, "max_ms": 0.0}
+            st["count"] += 1
+            st["total_ms"] += ms
+            st["last_ms"] = ms
+            st["max_ms"] = max(st["max_ms"], ms)
+
+    @contextmanager
+    def section(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - t0) * 1000)
+
+    def gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "sections": {k: dict(v) for k, v in self.sections.items()},
+                "gauges": dict(self.gauges),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.sections.clear()
+            self.gauges.clear()
+
+
+PERF = PerfStats()
+
+
+def timed(name):
+    """関数/メソッドの所要時間を PERF に name で記録するデコレータ。"""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kw):
+            with PERF.section(name):
+                return fn(*args, **kw)
+        return wrapper
+    return deco
+
+
+# ---- model helpers (Tk 非依存) ----
+def child_lane(parent_lane, mode):
+    """接続詞ルールの mode（same/next/meta）から子ノードの列を決める。"""
+    if mode == "meta":
+        return LANE_META
+    if mode == "next":
+        return parent_lane + 1 if parent_lane != LANE_META else 0
+    return parent_lane if parent_lane != LANE_META else 0
+
+
+def read_map_file(path):
+    """保存済み JSON を読み込み、nodes/edges の形だけ確認して返す。"""
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    if not isinstance(payload.get("nodes"), dict) or not isinstance(payload.get("edges"), list):
+        raise ValueError("nodes(dict) / edges(list) が見つかりません。")
+    return payload
+
+
+def write_map_file(path, nodes, edges):
+    """nodes/edges を保存形式の JSON として書き出す。"""
+    payload = {"nodes": nodes, "edges": edges, "meta": {"app": "quiet-map", "version": 1}}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+
+
+def collect_subtree(nodes, edges, root_id):
+    """root_id から edges をたどった部分木をコピーして返す（{"root","nodes","edges"}）。"""
+    children = {}
+    for e in edges:
+        children.setdefault(e["source"], []).append(e["target"])
+
+    seen = set()
+    stack = [root_id]
+    while stack:
+        x = stack.pop()
+        if x in seen or x not in nodes:
+            continue
+        seen.add(x)
+        stack.extend(children.get(x, []))
+
+    sub_nodes = {x: dict(nodes[x]) for x in seen}
+    sub_edges = [dict(e) for e in edges if e["source"] in seen and e["target"] in seen]
+    return {"root": root_id, "nodes": sub_nodes, "edges": sub_edges}
+
+
+def remap_ids(nodes, edges, taken):
+    """nodes/edges の ID を taken と衝突しない新 ID へ一括で振り直す。
+
+    戻り値は (new_nodes, new_edges, id_map)。範囲外を指す parent は空にし、
+    範囲外を指すエッジは落とす。
+    """
+    id_map = {}
+    used = set()
+    for old in nodes:
+        new = uuid.uuid4().hex[:10]
+        while new in taken or new in used:
+            new = uuid.uuid4().hex[:10]
+        used.add(new)
+        id_map[old] = new
+
+    new_nodes = {}
+    for old, n in nodes.items():
+        m = dict(n)
+        m["id"] = id_map[old]
+        m["parent"] = id_map.get(n.get("parent") or "", "")
+        new_nodes[m["id"]] = m
+
+    new_edges = []
+    for e in edges:
+        s = id_map.get(e.get("source"))
+        t = id_map.get(e.get("target"))
+        if s and t:
+            new_edges.append(dict(e, source=s, target=t))
+    return new_nodes, new_edges, id_map
+
+
+def rebase_lanes(sub, new_root_lane):
+    """部分木の列を、ルートの新しい列に合わせて付け替える（sub["nodes"] を直接更新）。
+
+    既知の接続詞は add_child と同じ CONNECTOR_TO_RULE で決め、
+    未知の接続詞は元の親子の列差を保つ。
+    """
+    nodes = sub["nodes"]
+    children = {}
+    for e in sub["edges"]:
+        children.setdefault(e["source"], []).append(e["target"])
+
+    old_lane = {nid: int(n.get("lane", 0)) for nid, n in nodes.items()}
+    nodes[sub["root"]]["lane"] = new_root_lane
+
+    stack = [sub["root"]]
+    seen = {sub["root"]}
+    while stack:
+        pid = stack.pop()
+        pl_old = old_lane[pid]
+        pl_new = int(nodes[pid]["lane"])
+        for cid in children.get(pid, []):
+            if cid in seen:
+                continue
+            seen.add(cid)
+            c = nodes[cid]
+            conn = (c.get("connector") or "").strip()
+            if conn in CONNECTOR_TO_RULE:
+                c["lane"] = child_lane(pl_new, CONNECTOR_TO_RULE[conn][1])
+            elif old_lane[cid] == LANE_META or pl_old == LANE_META or pl_new == LANE_META:
+                c["lane"] = old_lane[cid]
+            else:
+                c["lane"] = max(0, pl_new + old_lane[cid] - pl_old)
+            stack.append(cid)
+
+
+def edge_parents(edges):
+    """target -> 親 ID の集合（edges 由来）。source / target の無いエッジは数えない。"""
+    mp = {}
+    for e in edges:
+        src = e.get("source")
+        dst = e.get("target")
+        if src and dst:
+            mp.setdefault(dst, set()).add(src)
+    return mp
+
+
+def diff_maps(old, new):
+    """2つの保存データ（{"nodes","edges"}）をノード ID で突き合わせ、変更一覧を返す。
+
+    各要素は {"op", "id", ...}。op は added / removed / text / connector / lane / parent。
+    ノード数・エッジ数に対して線形時間。
+    """
+    on, nn = old["nodes"], new["nodes"]
+    op_, np_ = edge_parents(old["edges"]), edge_parents(new["edges"])
+    empty = set()
+    changes = []
+
+    for nid, b in nn.items():
+        a = on.get(nid)
+        if a is None:
+            changes.append({"op": "added", "id": nid, "lane": b.get("lane", 0), "text": b.get("text", "")})
+            continue
+        if (a.get("text") or "").strip() != (b.get("text") or "").strip():
+            changes.append({"op": "text", "id": nid, "old": a.get("text", ""), "new": b.get("text", "")})
+        if (a.get("connector") or "") != (b.get("connector") or ""):
+            changes.append({"op": "connector", "id": nid, "old": a.get("connector", ""), "new": b.get("connector", "")})
+        if int(a.get("lane", 0)) != int(b.get("lane", 0)):
+            changes.append({"op": "lane", "id": nid, "old": int(a.get("lane", 0)), "new": int(b.get("lane", 0))})
+        pa, pb = op_.get(nid, empty), np_.get(nid, empty)
+        if pa != pb:
+            changes.append({"op": "parent", "id": nid, "old": sorted(pa, key=str), "new": sorted(pb, key=str)})
+
+    for nid, a in on.items():
+        if nid not in nn:
+            changes.append({"op": "removed", "id": nid, "lane": a.get("lane", 0), "text": a.get("text", "")})
+    return changes
+
+
+def compute_layout(nodes):
+    """区画・列ごとに y 順で詰め直した新しい y を {nid: y} で返す（nodes は変更しない）。
+
+    区画（n["section"]、省略時 0）は番号順に縦に並べ、前の区画の一番下から
+    SECTION_GAP 空けて始める。
+    """
+    groups = {}
+    for nid, n in nodes.items():
+        key = (int(n.get("section", 0)), int(n.get("lane", 0)))
+        groups.setdefault(key, []).append(nid)
+
+    out = {}
+    top = bottom = 60
+    cur = None
+    for sec, lane in sorted(groups):
+        if sec != cur:
+            if cur is not None:
+                top = bottom + SECTION_GAP
+            cur = sec
+            bottom = top
+        ids = groups[(sec, lane)]
+        ids.sort(key=lambda i: int(nodes[i].get("y", 0)))
+        y = top
+        step = 92 if lane != LANE_META else 86
+        for i in ids:
+            out[i] = y
+            y += step
+        bottom = max(bottom, y)
+    return out
+
+
+def set_section(n, sec):
+    """n の区画を sec にする（0 は既定なので保存しない）。"""
+    if sec:
+        n["section"] = sec
+    else:
+        n.pop("section", None)
+
+
+def snapshot_model(nodes, edges):
+    """バックグラウンド処理に渡すための、ノード/エッジの浅いコピー。"""
+    return {nid: dict(n) for nid, n in nodes.items()}, [dict(e) for e in edges]
+
+
+VALIDATE_ISSUES = (
+    "id_mismatch",       # dict のキーと n["id"] が違う
+    "bad_fields",        # lane / y / section が整数にならない
+    "malformed_edges",   # source / target が無いエッジ
+    "dangling_edges",    # 存在しないノードを指すエッジ
+    "self_loops",
+    "duplicate_edges",
+    "multi_parent",      # 2本目以降の親エッジ（最初の1本を残す）
+    "cycles",            # 循環（循環に入るエッジを1本切る）
+    "parent_mismatch",   # parent が edges と食い違う
+    "lane_mismatch",     # 列が接続詞（CONNECTOR_TO_RULE）と矛盾する
+)
+
+
+def validate_map(nodes, edges, repair=False):
+    """nodes/edges の整合性を O(V+E) で調べ、件数と所要時間を返す。
+
+    repair=True なら同じ引数をその場で直す: 壊れた/重複/余分なエッジを落とし、
+    循環を切り、parent を edges から作り直し、列を CONNECTOR_TO_RULE で付け直す。
+    """
+    t0 = time.perf_counter()
+    report = dict.fromkeys(VALIDATE_ISSUES, 0)
+
+    # ---- nodes ----
+    for nid, n in nodes.items():
+        if n.get("id") != nid:
+            report["id_mismatch"] += 1
+            if repair:
+                n["id"] = nid
+        for key, default in (("lane", 0), ("y", 60), ("section", 0)):
+            v = n.get(key, default)
+            if type(v) is int:
+                continue
+            try:
+                int(v)
+            except (TypeError, ValueError):
+                report["bad_fields"] += 1
+                if repair:
+                    n[key] = default
+
+    # ---- edges (tree: at most one parent per node) ----
+    kept = []
+    par = {}
+    for e in edges:
+        src = e.get("source") if isinstance(e, dict) else None
+        dst = e.get("target") if isinstance(e, dict) else None
+        if not src or not dst:
+            report["malformed_edges"] += 1
+        elif src not in nodes or dst not in nodes:
+            report["dangling_edges"] += 1
+        elif src == dst:
+            report["self_loops"] += 1
+        elif dst in par:
+            report["duplicate_edges" if par[dst] == src else "multi_parent"] += 1
+        else:
+            par[dst] = src
+            kept.append(e)
+
+    # ---- cycles: follow parent pointers, cut the edge that closes a loop ----
+    state = {}
+    cut = set()
+    for start in nodes:
+        path = []
+        x = start
+        while x is not None and x not in state:
+            state[x] = 1
+            path.append(x)
+            x = par.get(x)
+        if x is not None and state[x] == 1:
+            report["cycles"] += 1
+            cut.add(x)
+        for y in path:
+            state[y] = 2
+    for x in cut:
+        del par[x]
+    if cut:
+        kept = [e for e in kept if e["target"] not in cut or par.get(e["target"]) == e["source"]]
+
+    # ---- parent field ----
+    for nid, n in nodes.items():
+        want = par.get(nid, "")
+        if (n.get("parent") or "") != want:
+            report["parent_mismatch"] += 1
+            if repair:
+                n["parent"] = want
+
+    # ---- lanes, top-down from roots ----
+    children = {}
+    for c, pid in par.items():
+        children.setdefault(pid, []).append(c)
+    lane_of = {}
+    stack = [nid for nid in nodes if nid not in par]
+    while stack:
+        nid = stack.pop()
+        n = nodes[nid]
+        try:
+            lane = int(n.get("lane", 0))
+        except (TypeError, ValueError):
+            lane = 0
+        rule = CONNECTOR_TO_RULE.get((n.get("connector") or "").strip())
+        want = lane
+        if rule is not None:
+            mode = rule[1]
+            pid = par.get(nid)
+            if mode == "meta":
+                want = LANE_META
+            elif pid is None or lane_of[pid] == LANE_META:
+                # 親が無い/非賛否: 賛否列にいれば良い（編集画面と同じ扱い）
+                want = lane if lane != LANE_META else 0
+            else:
+                want = child_lane(lane_of[pid], mode)
+        if want != lane:
+            report["lane_mismatch"] += 1
+            if repair:
+                n["lane"] = want
+        lane_of[nid] = want if repair else lane
+        stack.extend(children.get(nid, ()))
+
+    if repair:
+        edges[:] = kept
+
+    report["issues"] = sum(report[k] for k in VALIDATE_ISSUES)
+    report["repaired"] = bool(repair and report["issues"])
+    report["nodes"] = len(nodes)
+    report["edges"] = len(edges)
+    report["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    return report
+
+
+def format_report(report):
+    """validate_map の結果を、0 でない項目だけの短い文章にする。"""
+    lines = [f"{k}: {report[k]}" for k in VALIDATE_ISSUES if report.get(k)]
+    if not lines:
+        lines.append("問題は見つかりませんでした。")
+    lines.append(f"（nodes {report['nodes']} / edges {report['edges']} / {report['elapsed_ms']} ms）")
+    return "\n".join(lines)
+
+
+# ---- paragraph export (Tk 非依存) ----
+def paragraph_nodes(nodes):
+    """アプリ内部のノード dict を、文章生成用のリスト（parent_id 形式）に変換する。"""
+
+    # ---- normalize nodes to a simple list (parent_id format) ----
+    node_list = []
+    for nid, n in nodes.items():
+        t = (n.get("text") or "").strip()
+        if not t:
+            # allow empty nodes, but they don't add meaning in output
+            pass
+        ntype = (n.get("type") or "").strip()
+
+        # Map app-internal types to generator types
+        if ntype == "issue_shift":
+            node_type = "meta_issue_shift"
+        elif ntype in ("assumption", "definition", "question", "clarification"):
+            node_type = "meta"
+        elif ntype in ("premise", "evidence", "counter", "rebuttal", "claim"):
+            # align naming a bit
+            node_type = {
+                "counter": "counterclaim",
+                "rebuttal": "rebuttal",
+                "claim": "claim",
+            }.get(ntype, ntype)
+        else:
+            # fallback: treat unknown as meta (quiet default)
+            node_type = "meta"
+
+        parent_id = (n.get("parent") or "").strip() or None
+
+        node_list.append({
+            "id": nid,
+            "parent_id": parent_id,
+            "text": t,
+            "node_type": node_type,
+            "connector": (n.get("connector") or "").strip(),
+            # order: prefer explicit, else y, else 0
+            "order": int(n.get("order", n.get("y", 0) or 0)),
+        })
+    return node_list
+
+
+@timed("generate_structured_text")
+def generate_structured_text(nodes):
+    """paragraph_nodes() のリストから、段落構造の文章を生成する。"""
+    # ---- index nodes ----
+    node_by_id = {n["id"]: n for n in nodes}
+    children = {n["id"]: [] for n in nodes}
+    for n in nodes:
+        pid = n.get("parent_id")
+        if pid and pid in children:
+            children[pid].append(n["id"])
+
+    # ---- roots ----
+    roots = [n["id"] for n in nodes if not n.get("parent_id")]
+
+    def text(nid):
+        return (node_by_id[nid].get("text") or "").strip()
+
+    def ntype(nid):
+        return node_by_id[nid].get("node_type", "")
+
+    def connector(nid):
+        return node_by_id[nid].get("connector", "")
+
+    def ordered(ids):
+        return sorted(ids, key=lambda i: (node_by_id[i].get("order", 0), i))
+
+    def ensure_end(s):
+        s = (s or "").strip()
+        if not s:
+            return ""
+        return s if s.endswith(("。", "？", "！", ".", "?", "!")) else s + "。"
+
+    # ---- same-lane cluster ----
+    def render_same_cluster(nid):
+        parts = []
+        main = ensure_end(text(nid))
+        if main:
+            parts.append(main)
+
+        for cid in ordered(children.get(nid, [])):
+            ct = ntype(cid)
+            if ct not in ("premise", "evidence", "meta"):
+                continue
+            if ct == "meta" and ntype(cid) == "meta_issue_shift":
+                continue
+
+            t = ensure_end(text(cid))
+            if not t:
+                continue
+
+            if ct == "premise":
+                parts.append(f"なぜなら、{t}")
+            elif ct == "evidence":
+                parts.append(f"例えば、{t}")
+            elif ct == "meta":
+                prefix = {
+                    "前提として": "前提として、",
+                    "定義として": "定義として、",
+                    "問いとして": "ここで問いは、",
+                    "補足として": "なお、",
+                }.get(connector(cid), "なお、")
+                parts.append(prefix + t)
+        return "".join(parts).strip()
+
+    def render_from(nid):
+        out = []
+        nt = ntype(nid)
+
+        if nt == "meta_issue_shift":
+            # Issue shift nodes start a new section; header is added once outside
+            title = ensure_end(text(nid))
+            if title:
+                out.append(title)
+            for c in ordered(children.get(nid, [])):
+                out.extend(render_from(c))
+            out.append("")
+            return out
+
+        para = render_same_cluster(nid)
+        if para:
+            out.append(para)
+
+        for cid in ordered(children.get(nid, [])):
+            ct = ntype(cid)
+            if ct == "counterclaim":
+                t = ensure_end(text(cid))
+                if t:
+                    out.append("しかし、" + t)
+                # include same-lane support under this node
+                cluster = render_same_cluster(cid)
+                if cluster:
+                    out[-1] = cluster.replace(ensure_end(text(cid)), "しかし、" + ensure_end(text(cid))).strip()
+                # recurse
+                for cc in ordered(children.get(cid, [])):
+                    if ntype(cc) in ("rebuttal", "counterclaim", "meta_issue_shift", "claim"):
+                        out.extend(render_from(cc))
+
+            elif ct == "rebuttal":
+                t = ensure_end(text(cid))
+                if t:
+                    out.append("それでも、" + t)
+                cluster = render_same_cluster(cid)
+                if cluster:
+                    out[-1] = cluster.replace(ensure_end(text(cid)), "それでも、" + ensure_end(text(cid))).strip()
+                for cc in ordered(children.get(cid, [])):
+                    if ntype(cc) in ("rebuttal", "counterclaim", "meta_issue_shift", "claim"):
+                        out.extend(render_from(cc))
+
+            elif ct in ("claim", "meta_issue_shift"):
+                out.extend(render_from(cid))
+
+        return out
+
+    paragraphs = []
+    main_roots = [r for r in ordered(roots) if ntype(r) != "meta_issue_shift"]
+    issue_roots = [r for r in ordered(roots) if ntype(r) == "meta_issue_shift"]
+
+    # main discussion
+    for r in main_roots:
+        paragraphs.extend(render_from(r))
+
+    # issue shifts grouped once
+    if issue_roots:
+        paragraphs.append("")
+        paragraphs.append("【論点を変えて】")
+        for r in issue_roots:
+            paragraphs.extend(render_from(r))
+
+
+    # clean consecutive blanks
+    cleaned = []
+    prev_blank = False
+    for p in paragraphs:
+        blank = not (p or "").strip()
+        if blank and prev_blank:
+            continue
+        cleaned.append(p)
+        prev_blank = blank
+    return "\n\n".join(cleaned).strip()
+
+
+def export_text(nodes):
+    """nodes（アプリ内部の dict）から出力用の文章を作る。"""
+    return generate_structured_text(paragraph_nodes(nodes))
+
+
+# ---- SVG export (Tk 非依存・逐次書き出し) ----
+SVG_FONT = "'Meiryo UI', 'Hiragino Sans', 'Noto Sans CJK JP', sans-serif"
+SVG_WRAP = 26  # estimate_h と同じ 1行あたりの文字数
+
+
+def _svg_text(x, y, text, cls, anchor="start"):
+    return f'<text x="{x:g}" y="{y:g}" class="{cls}" text-anchor="{anchor}">{escape(text)}</text>\n'
+
+
+@timed("export_svg")
+def export_svg(nodes, edges, out):
+    """マップ全体を SVG として out（パスまたはテキストファイル）へ書き出す。
+
+    DOM や全体の文字列は作らず、レーン帯 → 矢印 → ノードの順に1要素ずつ書く。
+    座標は Canvas と同じ node_bbox / lane_to_x / edge_points を使う。
+    """
+    if isinstance(out, (str, os.PathLike)):
+        with open(out, "w", encoding="utf-8") as f:
+            _write_svg(nodes, edges, f)
+    else:
+        _write_svg(nodes, edges, out)
+
+
+def _write_svg(nodes, edges, out):
+    # 1st pass: canvas size and lane count only (no per-node buffers)
+    max_x = max_y = 0
+    max_lane = -1
+    for n in nodes.values():
+        x1, y1, x2, y2 = node_bbox(n)
+        max_x = max(max_x, x2)
+        max_y = max(max_y, y2)
+        max_lane = max(max_lane, int(n.get("lane", 0)))
+    if max_lane < 0:
+        max_lane = 3
+    width = max(max_x, lane_to_x(max_lane) + LANE_W) + 200
+    height = max_y + 200
+
+    w = out.write
+    w('<?xml version="1.0" encoding="UTF-8"?>\n')
+    w(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:g}" height="{height:g}" viewBox="0 0 {width:g} {height:g}">\n')
+    w('<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="8" markerHeight="8" orient="auto">'
+      '<path d="M0,0 L10,5 L0,10 z" fill="#444"/></marker></defs>\n')
+    w(f'<style>text{{font-family:{SVG_FONT};font-size:13px;fill:#000}} .b{{font-weight:bold}}'
+      ' .e{fill:none;stroke:#444;stroke-width:1;marker-end:url(#arrow)} .n{fill:#fff;stroke:#333;stroke-width:1}</style>\n')
+    w('<rect width="100%" height="100%" fill="#fff"/>\n')
+
+    # lanes (draw_lanes と同じ)
+    w(f'<rect x="{META_LEFT}" y="20" width="{META_W}" height="{height - 20:g}" fill="#f4f4f4"/>\n')
+    w(_svg_text(META_LEFT + META_W / 2, 35, "非賛否（前提/定義/問い/補足/論点切替）", "b", "middle"))
+    for lane in range(0, max_lane + 1):
+        lx0 = lane_to_x(lane)
+        fill = "#eaf4ff" if lane % 2 == 0 else "#ffeef0"
+        label = "賛成" if lane % 2 == 0 else "反対"
+        w(f'<rect x="{lx0}" y="20" width="{LANE_W}" height="{height - 20:g}" fill="{fill}"/>\n')
+        w(_svg_text(lx0 + LANE_W / 2, 35, f"{label}（列 {lane}）", "b", "middle"))
+
+    # arrows
+    for e in edges:
+        a = nodes.get(e.get("source"))
+        b = nodes.get(e.get("target"))
+        if not a or not b:
+            continue
+        x1, y1, mx, _, _, y2, x2, _ = edge_points(a, b)
+        w(f'<path class="e" d="M{x1:g},{y1:g}H{mx:g}V{y2:g}H{x2:g}"/>\n')
+
+    # nodes
+    for nid, n in nodes.items():
+        x1, y1, x2, y2 = node_bbox(n)
+        lane = int(n.get("lane", 0))
+        w(f'<g id={quoteattr(str(nid))}><rect class="n" x="{x1}" y="{y1}" width="{x2 - x1}" height="{y2 - y1}"/>')
+        connector = (n.get("connector") or "").strip()
+        title = connector if connector else ("非賛否" if lane == LANE_META else "")
+        if title:
+            w(_svg_text(x1 + 10, y1 + 17, title, "b"))
+        body = (n.get("text") or "").strip()
+        if body:
+            w(f'<text x="{x1 + 10}" y="{y1 + 32}">')
+            for i in range(0, len(body), SVG_WRAP):
+                dy = "1em" if i == 0 else f"{GRID_Y}"
+                w(f'<tspan x="{x1 + 10}" dy="{dy}">{escape(body[i:i + SVG_WRAP])}</tspan>')
+            w('</text>')
+        w('</g>\n')
+
+    w('</svg>\n')
+
+
+# ---- minimap ----
+class Minimap:
+    """マップ全体の縮小表示。
+
+    ノードごとの矩形をキャッシュしておき、redraw() のたびに作り直さず、
+    app から渡された変更ノード（列・本文が変わったもの）だけ座標を直す。
+    auto_layout で y だけ動いたノードは、縮小表示上で半ピクセル以上動くときだけ直す
+    （大きなマップでは列の下側が一斉にずれても、ほとんどは見た目が変わらない）。
+    """
+
+    WIDTH = 240
+    HEIGHT = 180
+    HEADROOM = 1.25  # 拡大時の余白（縮尺の付け直しを減らす）
+    FILLS = {LANE_META: "#b8b8b8", 0: "#6ea8fe", 1: "#f1828d"}
+
+    def __init__(self, app, canvas):
+        self.app = app
+        self.canvas = canvas
+        self.items = {}  # nid -> canvas item
+        self.lanes = {}  # nid -> lane（色の付け直し判定用）
+        self.boxes = {}  # nid -> 描いたときの node_bbox（ワールド座標）
+        self.world_w = 1.0
+        self.world_h = 1.0
+        self.content_h = 0.0  # 余白（HEADROOM）を掛ける前の高さ
+        self.max_lane = -1
+        self._view_item = None
+        self._sel_item = None
+
+    def _fill(self, lane):
+        return self.FILLS[LANE_META if lane == LANE_META else lane % 2]
+
+    def _rect(self, n):
+        return self._scale_box(node_bbox(n))
+
+    def _scale_box(self, box):
+        x1, y1, x2, y2 = box
+        sx = self.WIDTH / self.world_w
+        sy = self.HEIGHT / self.world_h
+        return x1 * sx, y1 * sy, x2 * sx, max(y1 * sy + 1, y2 * sy)
+
+    def _draw_lanes(self):
+        self.canvas.delete("lane")
+        sx = self.WIDTH / self.world_w
+        for lane in [LANE_META] + list(range(0, self.max_lane + 1)):
+            x1 = lane_to_x(lane)
+            w = META_W if lane == LANE_META else LANE_W
+            fill = "#f4f4f4" if lane == LANE_META else ("#eaf4ff" if lane % 2 == 0 else "#ffeef0")
+            self.canvas.create_rectangle(x1 * sx, 0, (x1 + w) * sx, self.HEIGHT, fill=fill, outline="", tags="lane")
+        self.canvas.tag_lower("lane")
+
+    def _set_world(self, max_lane, max_y):
+        self.max_lane = max(3, max_lane)
+        self.world_w = lane_to_x(self.max_lane) + LANE_W + GAP_X
+        self.content_h = max_y
+        self.world_h = max(1.0, max_y * self.HEADROOM)
+
+    def rebuild(self):
+        """全ノードを描き直す（読込・初期化・ズームのときだけ）。"""
+        nodes = self.app.nodes
+        max_y = 0
+        max_lane = -1
+        for n in nodes.values():
+            max_y = max(max_y, node_bbox(n)[3])
+            max_lane = max(max_lane, int(n.get("lane", 0)))
+        self._set_world(max_lane, max_y + 200)
+
+        self.canvas.delete("all")
+        self.items = {}
+        self.lanes = {}
+        self.boxes = {}
+        self._draw_lanes()
+        for nid, n in nodes.items():
+            lane = int(n.get("lane", 0))
+            box = self.boxes[nid] = node_bbox(n)
+            self.items[nid] = self.canvas.create_rectangle(*self._scale_box(box), fill=self._fill(lane), outline="", tags="node")
+            self.lanes[nid] = lane
+        self._sel_item = self.canvas.create_rectangle(-10, -10, -10, -10, outline="#1f6feb", width=2)
+        self._view_item = self.canvas.create_rectangle(-10, -10, -10, -10, outline="#333")
+        self.show_viewport()
+
+    @timed("minimap_update")
+    def update(self, ids, moved=()):
+        """ids のノードだけ矩形を追加・移動・削除する。
+
+        moved は y だけが変わったノード（auto_layout の結果）で、見た目が変わるものだけ動かす。
+        """
+        if self._view_item is None:
+            self.rebuild()
+            return
+        nodes = self.app.nodes
+        boxes = self.boxes
+        created = False
+        for nid in ids:
+            n = nodes.get(nid)
+            item = self.items.get(nid)
+            if n is None:
+                if item is not None:
+                    self.canvas.delete(item)
+                    del self.items[nid]
+                    del self.lanes[nid]
+                    del boxes[nid]
+                continue
+
+            lane = int(n.get("lane", 0))
+            box = boxes[nid] = node_bbox(n)
+            bottom = box[3] + 200
+            if lane > self.max_lane or bottom > self.world_h:
+                self._grow(max(lane, self.max_lane), max(bottom, self.content_h))
+
+            if item is None:
+                self.items[nid] = self.canvas.create_rectangle(*self._scale_box(box), fill=self._fill(lane), outline="", tags="node")
+                self.lanes[nid] = lane
+                created = True
+                continue
+            self.canvas.coords(item, *self._scale_box(box))
+            if self.lanes[nid] != lane:
+                self.canvas.itemconfigure(item, fill=self._fill(lane))
+                self.lanes[nid] = lane
+
+        half_px = 0.5 * self.world_h / self.HEIGHT  # 縮小表示の半ピクセル（ワールド座標）
+        for nid in moved:
+            box = boxes.get(nid)
+            n = nodes.get(nid)
+            if box is None or n is None:
+                continue  # 削除・追加は ids 側で扱う
+            y = n["y"]
+            if -half_px < y - box[1] < half_px:
+                continue  # 縮小表示ではほぼ動かない: 描いた位置のままにする
+            box = boxes[nid] = (box[0], y, box[2], y + box[3] - box[1])
+            if box[3] + 200 > self.world_h:
+                self._grow(self.max_lane, max(box[3] + 200, self.content_h))
+                half_px = 0.5 * self.world_h / self.HEIGHT
+            self.canvas.coords(self.items[nid], *self._scale_box(box))
+        if created:
+            self.canvas.tag_raise(self._sel_item)
+            self.canvas.tag_raise(self._view_item)
+
+    def _grow(self, max_lane, max_y):
+        """世界の大きさが縮尺を超えたとき、作り直さずに Canvas 側で縮める。"""
+        old_w, old_h = self.world_w, self.world_h
+        self._set_world(max_lane, max_y)
+        self.canvas.scale("node", 0, 0, old_w / self.world_w, old_h / self.world_h)
+        self._draw_lanes()
+
+    def show_selection(self, nid):
+        n = self.app.nodes.get(nid)
+        if n is None or self._sel_item is None:
+            if self._sel_item is not None:
+                self.canvas.coords(self._sel_item, -10, -10, -10, -10)
+            return
+        x1, y1, x2, y2 = self._rect(n)
+        self.canvas.coords(self._sel_item, x1 - 2, y1 - 2, x2 + 2, y2 + 2)
+
+    def show_viewport(self):
+        """メイン Canvas の表示範囲を枠で示す。"""
+        if self._view_item is None:
+            return
+        sw, sh = self.app.scroll_extent
+        fx0, fx1 = self.app.canvas.xview()
+        fy0, fy1 = self.app.canvas.yview()
+        sx = self.WIDTH / self.world_w
+        sy = self.HEIGHT / self.world_h
+        self.canvas.coords(self._view_item, fx0 * sw * sx, fy0 * sh * sy, fx1 * sw * sx, fy1 * sh * sy)
+
+    def jump(self, mx, my):
+        """縮小表示上の (mx, my) が中央に来るようにメイン Canvas をスクロールする。"""
+        sw, sh = self.app.scroll_extent
+        wx = mx * self.world_w / self.WIDTH
+        wy = my * self.world_h / self.HEIGHT
+        fx0, fx1 = self.app.canvas.xview()
+        fy0, fy1 = self.app.canvas.yview()
+        self.app.canvas.xview_moveto(max(0.0, wx / sw - (fx1 - fx0) / 2))
+        self.app.canvas.yview_moveto(max(0.0, wy / sh - (fy1 - fy0) / 2))
+        self.show_viewport()
+
+
+# ---- background worker ----
+class BackgroundWorker:
+    """重い処理をワーカースレッドで動かし、結果を Tk のメインスレッドへ届ける。
+
+    ワーカースレッドは結果をキューに積むだけで Tk には触れない。メインスレッドが
+    after() でキューを見て、コールバックを呼ぶ。同じ kind は最新の投入だけが有効で、
+    古い投入は取り消し（実行済みなら結果を捨てる）。
+
+    ワーカーは daemon スレッドなので、終了時に実行中の処理を待たない（処理は
+    モデルのコピーを読んで値を返すだけなので、途中で打ち切っても失うものは無い）。
+    ThreadPoolExecutor はインタプリタ終了時に実行中の処理を待つため使わない。
+    """
+
+    POLL_MS = 50
+
+    def __init__(self, root, max_workers=2):
+        self.root = root
+        self.jobs = queue.Queue()  # (future, fn, args)、None で停止
+        self.threads = [threading.Thread(target=self._run, name=f"quiet-map-{i}", daemon=True) for i in range(max_workers)]
+        for th in self.threads:
+            th.start()
+        self.results = queue.Queue()
+        self.pending = {}  # kind -> (gen, future, on_done, on_error)
+        self._gen = 0
+        self._polling = False
+
+    def submit(self, kind, fn, args, on_done, on_error=None):
+        """fn(*args) を投入する。同じ kind の未完了の投入は取り消す。"""
+        old = self.pending.get(kind)
+        if old is not None:
+            old[1].cancel()
+        self._gen += 1
+        gen = self._gen
+        fut = Future()
+        self.jobs.put((fut, fn, args))
+        self.pending[kind] = (gen, fut, on_done, on_error)
+        fut.add_done_callback(lambda f, k=kind, g=gen: self.results.put((k, g, f)))
+        self._schedule()
+        return gen
+
+    def busy(self):
+        return sorted(self.pending)
+
+    def _schedule(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.POLL_MS, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        while True:
+            try:
+                kind, gen, fut = self.results.get_nowait()
+            except queue.Empty:
+                break
+            cur = self.pending.get(kind)
+            if cur is None or cur[0] != gen or fut.cancelled():
+                continue  # superseded
+            del self.pending[kind]
+            _, _, on_done, on_error = cur
+            exc = fut.exception()
+            if exc is None:
+                on_done(fut.result())
+            elif on_error is not None:
+                on_error(exc)
+        if self.pending:
+            self._schedule()
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            fut, fn, args = job
+            if not fut.set_running_or_notify_cancel():
+                continue  # 取り消し済み
+            try:
+                fut.set_result(fn(*args))
+            except BaseException as e:
+                fut.set_exception(e)
+
+    def shutdown(self):
+        """未着手の投入を取り消し、ワーカーを止める（実行中の処理は待たない）。"""
+        self.pending.clear()
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job[0].cancel()
+        for _ in self.threads:
+            self.jobs.put(None)
+
+
+class QuietMapApp(tk.Tk if tk is not None else object):
+    STARTUP_WAIT_MS = 1000  # 最初の Expose を待つ上限
+
+    def __init__(self, path=None):
         super().__init__()
         self.title("quiet map")
         self.geometry("1200x720")
         self.minsize(980, 620)
 
+        self._init_state()
+        self._build_ui()
+        # 先にウィンドウを表示し、マップの読込・描画は画面に出た後（最初の Expose）で行う
+        self._startup_path = path
+        self._startup_job = self.after(self.STARTUP_WAIT_MS, self._start_load)  # Expose が来ないときの保険
+        self._expose_bind = self.bind("<Expose>", self._start_load, add="+")
+
+    def _start_load(self, event=None):
+        if self._startup_job is None:
+            return  # 開始済み
+        self.after_cancel(self._startup_job)
+        self._startup_job = None
+        self.unbind("<Expose>", self._expose_bind)
+        # Expose で積まれた再描画（アイドル処理）の後に読み込む
+        self.after_idle(self._initial_load, self._startup_path)
+
+    def _initial_load(self, path):
+        """起動時の読込。path があればサンプルを作らずにそのファイルを開く。"""
+        self.update_idletasks()
+        self.first_paint_at = time.perf_counter()  # 空のウィンドウが描けた時刻（起動時間の計測用）
+        if not (path and self.load_path(path)):
+            self.reset_to_sample()
+        self.ready = True
+
+    def _init_state(self):
+        """ウィジェット以外のアプリ状態を初期化する（ベンチマークからも使う）。"""
         self.scale = 1.0
         self.nodes = {}
         self.edges = []
         self.selected_id = ""
         self.drag_offset = (0, 0)
         self.dragging = False
-
-        self._build_ui()
-        self.reset_to_sample()
+        self._clip = None  # コピー中の部分木（collect_subtree の戻り値）
+        self.diff_marks = {}  # nid -> [op, ...]（差分表示中のみ）
+        self.perf_overlay = False
+        self._profiler = None
+        self.ready = False  # 起動時の読込が済んだか
+        self.first_paint_at = None
+        self._context_menu = None  # 初回の右クリックで作る
+        self._export_win = None  # 初回の文章出力で作る
+        self.minimap = None
+        self.scroll_extent = (1, 1)  # メイン Canvas の scrollregion（幅, 高さ）
+        self._dirty = set()  # 前回の redraw 以降に列/y/本文が変わったノード（縮小表示の差分更新用）
+        self._moved = set()  # auto_layout で y だけ動いたノード（同上）
+        self._dirty_all = True
+        self._rev = 0  # モデルの版。バックグラウンド結果が古いかどうかの判定に使う
+        self._worker = None  # 初回のバックグラウンド処理で作る
 
     def _build_ui(self):
         self.columnconfigure(0, weight=0)
@@ -181,18 +1319,36 @@ class QuietMapApp(tk.Tk):
         ttk.Button(btns, text="文章出力", command=self.export_paragraphs).grid(row=3, column=0, sticky="ew", padx=(0, 6), pady=3)
         ttk.Button(btns, text="初期化", command=self.reset_to_sample).grid(row=3, column=1, sticky="ew", pady=3)
 
+        ttk.Button(btns, text="JSON統合", command=self.merge_map_file).grid(row=4, column=0, sticky="ew", padx=(0, 6), pady=3)
+        ttk.Button(btns, text="貼り付け", command=self.paste_subtree).grid(row=4, column=1, sticky="ew", pady=3)
+
+        ttk.Button(btns, text="差分比較", command=self.toggle_diff).grid(row=5, column=0, sticky="ew", padx=(0, 6), pady=3)
+        ttk.Button(btns, text="SVG出力", command=self.save_svg).grid(row=5, column=1, sticky="ew", pady=3)
+
+        ttk.Button(btns, text="検証", command=self.check_now).grid(row=6, column=0, sticky="ew", padx=(0, 6), pady=3)
+
         for c in (0, 1):
             btns.columnconfigure(c, weight=1)
 
+        self.status = ttk.Label(left, text="", foreground="#888")
+        self.status.pack(anchor="w")
+
         ttk.Separator(left, orient="horizontal").pack(fill="x", pady=10)
 
         ttk.Label(left, text="選択ノード（詳細）", font=("Meiryo UI", 10, "bold")).pack(anchor="w")
 
-        self.detail = tk.Text(left, width=34, height=18, wrap="word", font=("Meiryo UI", 10))
+        self.detail = tk.Text(left, width=34, height=12, wrap="word", font=("Meiryo UI", 10))
         self.detail.pack(fill="both", expand=False)
         self.detail.configure(state="disabled")
 
-        ttk.Label(left, text="操作: 右クリック=追加/削除  ダブルクリック=編集\nCtrl+ホイール=ズーム", foreground="#444").pack(anchor="w", pady=(10, 0))
+        ttk.Label(left, text="全体図（クリックで移動）", font=("Meiryo UI", 10, "bold")).pack(anchor="w", pady=(10, 0))
+        mini = tk.Canvas(left, width=Minimap.WIDTH, height=Minimap.HEIGHT, bg="white", highlightthickness=1, highlightbackground="#ccc")
+        mini.pack(anchor="w")
+        self.minimap = Minimap(self, mini)
+        mini.bind("<Button-1>", lambda ev: self.minimap.jump(ev.x, ev.y))
+        mini.bind("<B1-Motion>", lambda ev: self.minimap.jump(ev.x, ev.y))
+
+        ttk.Label(left, text="操作: 右クリック=追加/削除  ダブルクリック=編集\nCtrl+C/Ctrl+V=部分木コピー/貼り付け\nCtrl+ホイール=ズーム\nF2=計測表示  F3=計測JSON保存  F4=プロファイル開始/停止", foreground="#444").pack(anchor="w", pady=(10, 0))
 
         right = ttk.Frame(self, padding=(0, 10, 10, 10))
         right.grid(row=0, column=1, sticky="nsew")
@@ -204,7 +1360,7 @@ class QuietMapApp(tk.Tk):
 
         vsb = ttk.Scrollbar(right, orient="vertical", command=self.canvas.yview)
         hsb = ttk.Scrollbar(right, orient="horizontal", command=self.canvas.xview)
-        self.canvas.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self.canvas.configure(yscrollcommand=lambda *a: self._on_scroll(vsb, *a), xscrollcommand=lambda *a: self._on_scroll(hsb, *a))
         vsb.grid(row=0, column=1, sticky="ns")
         hsb.grid(row=1, column=0, sticky="ew")
 
@@ -218,14 +1374,33 @@ class QuietMapApp(tk.Tk):
         self.canvas.bind("<Control-Button-4>", self.on_ctrl_wheel)
         self.canvas.bind("<Control-Button-5>", self.on_ctrl_wheel)
 
-        self._context_menu = tk.Menu(self, tearoff=0)
+        self.canvas.bind("<Control-c>", lambda ev: self.copy_subtree())
+        self.canvas.bind("<Control-v>", lambda ev: self.paste_subtree())
+
+        self.bind("<F2>", lambda ev: self.toggle_perf_overlay())
+        self.bind("<F3>", lambda ev: self.dump_perf())
+        self.bind("<F4>", lambda ev: self.toggle_profiler())
+
+        self.canvas.create_text(20, 20, anchor="nw", text="読込中…", fill="#888", font=("Meiryo UI", 10))
 
     # ---- model ----
+    def _touch(self, *ids):
+        """ノードの変更を記録する（縮小表示の差分更新と、モデルの版）。"""
+        self._dirty.update(ids)
+        self._rev += 1
+
+    def _touch_all(self):
+        """モデル全体が入れ替わったことを記録する。"""
+        self._dirty_all = True
+        self._rev += 1
+
     def reset_to_sample(self):
         payload = sample_map()
         self.nodes = payload["nodes"]
+        self._touch_all()
         self.edges = payload["edges"]
         self.selected_id = ""
+        self.diff_marks = {}
         self.scale = 1.0
         self.auto_layout()
         self.redraw()
@@ -242,6 +1417,7 @@ class QuietMapApp(tk.Tk):
             "text": "（ここに本文）",
             "parent": "",
         }
+        self._touch(node_id)
         self.selected_id = node_id
         self.auto_layout()
         self.redraw()
@@ -258,6 +1434,7 @@ class QuietMapApp(tk.Tk):
             "text": "（ここに本文）",
             "parent": "",
         }
+        self._touch(node_id)
         self.selected_id = node_id
         self.auto_layout()
         self.redraw()
@@ -277,13 +1454,7 @@ class QuietMapApp(tk.Tk):
             return
 
         ntype, mode = CONNECTOR_TO_RULE.get(connector, ("clarification", "same"))
-        pl = int(parent.get("lane", 0))
-        if mode == "meta":
-            lane2 = LANE_META
-        elif mode == "next":
-            lane2 = pl + 1 if pl != LANE_META else 0
-        else:
-            lane2 = pl if pl != LANE_META else 0
+        lane2 = child_lane(int(parent.get("lane", 0)), mode)
 
         node_id = uuid.uuid4().hex[:10]
         self.nodes[node_id] = {
@@ -296,12 +1467,14 @@ class QuietMapApp(tk.Tk):
             "text": "（ここに本文）",
             "parent": "",
         }
+        set_section(self.nodes[node_id], int(parent.get("section", 0)))
         # issue_shift ノードは「論点の分岐」を示すため、矢印で結ばない（quiet map の方針）
         if ntype == "issue_shift":
             self.nodes[node_id]["parent"] = ""  # no parent link
         else:
             self.edges.append({"source": parent_id, "target": node_id})
             self.nodes[node_id]["parent"] = parent_id
+        self._touch(node_id)
         self.selected_id = node_id
         self.auto_layout()
         self.redraw()
@@ -323,52 +1496,195 @@ class QuietMapApp(tk.Tk):
         self.edges = [e for e in self.edges if e["source"] not in to_delete and e["target"] not in to_delete]
         for x in to_delete:
             self.nodes.pop(x, None)
+        self._touch(*to_delete)
         if self.selected_id in to_delete:
             self.selected_id = ""
         self.auto_layout()
         self.redraw()
 
+    # ---- copy / paste / merge ----
+    def copy_subtree(self, nid=""):
+        """選択ノード以下の部分木をコピーする（他ウィンドウ用にクリップボードにも JSON で置く）。"""
+        nid = nid or self.selected_id
+        if nid not in self.nodes:
+            return
+        self._clip = collect_subtree(self.nodes, self.edges, nid)
+        self.clipboard_clear()
+        self.clipboard_append(json.dumps({"quiet-map-subtree": self._clip}, ensure_ascii=False))
+
+    def _clipboard_subtree(self):
+        try:
+            payload = json.loads(self.clipboard_get())
+            sub = payload["quiet-map-subtree"]
+            if isinstance(sub.get("nodes"), dict) and isinstance(sub.get("edges"), list) and sub.get("root") in sub["nodes"]:
+                return sub
+        except (tk.TclError, ValueError, TypeError, KeyError, AttributeError):
+            pass
+        return self._clip
+
+    def paste_subtree(self, target_id=""):
+        """コピーした部分木を target_id（省略時は選択ノード）の子として貼り付ける。
+
+        ID は一括で振り直し、列は貼り付け先を基準に CONNECTOR_TO_RULE で付け替える。
+        貼り付け先が無い（または issue_shift）場合は元の列のまま末尾に置く。
+        """
+        sub = self._clipboard_subtree()
+        if not sub:
+            return
+        target_id = target_id or self.selected_id
+        target = self.nodes.get(target_id)
+        if target and int(target.get("lane", 0)) == LANE_META and (target.get("type") or "") == "issue_shift":
+            target = None
+
+        try:
+            # 外部から来たクリップボードも壊れていることがあるので、コピーを検証・修復してから使う
+            nodes, edges, id_map = remap_ids(sub["nodes"], sub["edges"], self.nodes)
+            validate_map(nodes, edges, repair=True)
+            root_id = id_map[sub["root"]]
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            messagebox.showerror("貼り付けエラー", f"部分木を読み取れませんでした: {e}")
+            return
+        root = nodes[root_id]
+        root_y = int(root.get("y", 0))
+        if target:
+            base_y = int(target.get("y", 0)) + 90
+            sec = int(target.get("section", 0))
+            conn = (root.get("connector") or "").strip()
+            mode = CONNECTOR_TO_RULE.get(conn, ("clarification", "same"))[1]
+            rebase_lanes({"root": root_id, "nodes": nodes, "edges": edges}, child_lane(int(target.get("lane", 0)), mode))
+        else:
+            base_y = max((int(n.get("y", 0)) for n in self.nodes.values()), default=0) + 90
+            sec = max((int(n.get("section", 0)) for n in self.nodes.values()), default=0)  # 最後の区画の末尾
+        for n in nodes.values():
+            n["y"] = base_y + int(n.get("y", 0)) - root_y
+            set_section(n, sec)
+
+        root["parent"] = ""
+        if target and (root.get("type") or "") != "issue_shift":
+            edges.append({"source": target_id, "target": root_id})
+            root["parent"] = target_id
+
+        self.nodes.update(nodes)
+        self.edges.extend(edges)
+        self._touch(*nodes)
+        self.selected_id = root_id
+        self.auto_layout()
+        self.redraw()
+
+    def merge_map_file(self):
+        """別の保存済み JSON を、新しい区画として現在のマップの下にまとめて取り込む。"""
+        path = filedialog.askopenfilename(title="JSON統合", filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            payload = read_map_file(path)
+            report = validate_map(payload["nodes"], payload["edges"])
+            if report["issues"] and messagebox.askyesno("統合", format_report(report) + "\n\n修復しますか？"):
+                validate_map(payload["nodes"], payload["edges"], repair=True)
+            nodes, edges, _ = remap_ids(payload["nodes"], payload["edges"], self.nodes)
+            # 取り込むマップは既存の区画の後ろに、自分の区画の並びを保ったまま置く
+            base = max((int(n.get("section", 0)) for n in self.nodes.values()), default=0) + 1
+            for n in nodes.values():
+                set_section(n, base + int(n.get("section", 0)))
+        except Exception as e:
+            messagebox.showerror("読込エラー", str(e))
+            return
+
+        self.nodes.update(nodes)
+        self.edges.extend(edges)
+        self._touch(*nodes)
+        self.selected_id = ""
+        self.diff_marks = {}
+        self.auto_layout()
+        self.redraw()
+
     # ---- layout ----
     def lane_to_x(self, lane):
-        if lane == LANE_META:
-            return META_LEFT
-        return META_LEFT + META_W + GAP_X + lane * (LANE_W + GAP_X)
+        return lane_to_x(lane)
 
     def estimate_h(self, text):
-        s = (text or "").strip()
-        if not s:
-            return NODE_H_MIN
-        lines = max(1, math.ceil(len(s) / 26))
-        return NODE_H_MIN + (lines - 1) * GRID_Y
+        return estimate_h(text)
 
     def node_bbox(self, n):
-        x1 = self.lane_to_x(int(n["lane"]))
-        y1 = int(n["y"])
-        w = (META_W - 20) if int(n["lane"]) == LANE_META else NODE_W
-        h = max(NODE_H_MIN, self.estimate_h(n.get("text", "")))
-        return x1, y1, x1 + w, y1 + h
+        return node_bbox(n)
 
+    @timed("auto_layout")
     def auto_layout(self):
-        lanes = {}
-        for nid, n in self.nodes.items():
-            lane = int(n.get("lane", 0))
-            lanes.setdefault(lane, []).append(nid)
+        self._apply_layout(compute_layout(self.nodes))
 
-        for lane, ids in lanes.items():
-            ids.sort(key=lambda i: int(self.nodes[i].get("y", 0)))
-            y = 60
-            step = 92 if lane != LANE_META else 86
-            for i in ids:
-                self.nodes[i]["y"] = y
-                y += step
+    def _apply_layout(self, ys):
+        for i, y in ys.items():
+            n = self.nodes.get(i)
+            if n is not None and n.get("y") != y:
+                n["y"] = y
+                self._moved.add(i)
 
     def align_now(self):
-        """整列ボタン用: レイアウトを計算して即座に再描画する。"""
+        """整列ボタン用: レイアウトを計算して再描画する（大きなマップはバックグラウンドで）。"""
+        if len(self.nodes) < ASYNC_MIN_NODES:
+            self.auto_layout()
+            self.redraw()
+            return
+        rev = self._rev
+        nodes, _ = snapshot_model(self.nodes, [])
+
+        def done(ys):
+            if rev != self._rev:
+                return  # 計算中に編集された: 古い結果は使わない
+            self._apply_layout(ys)
+            self.redraw()
+        self.run_background("整列", compute_layout, (nodes,), done)
+
+    # ---- background ----
+    def run_background(self, kind, fn, args, on_done):
+        """fn(*args) をワーカーで実行し、完了したらメインスレッドで on_done(result) を呼ぶ。"""
+        if self._worker is None:
+            self._worker = BackgroundWorker(self)
+
+        def finish(result):
+            on_done(result)
+            self._show_busy()
+
+        def fail(exc):
+            self._show_busy()
+            messagebox.showerror("エラー", f"{kind}: {exc}")
+
+        self._worker.submit(kind, fn, args, finish, fail)
+        self._show_busy()
+
+    def _show_busy(self):
+        kinds = self._worker.busy() if self._worker is not None else []
+        self.status.configure(text=("処理中: " + "、".join(kinds)) if kinds else "")
+
+    def destroy(self):
+        if self._worker is not None:
+            self._worker.shutdown()
+        super().destroy()
+
+    def check_now(self):
+        """検証ボタン用: 整合性を調べて結果を表示し、問題があれば修復を提案する。"""
+        nodes, edges = snapshot_model(self.nodes, self.edges)
+
+        def done(report):
+            if not report["issues"]:
+                messagebox.showinfo("検証", format_report(report))
+                return
+            if messagebox.askyesno("検証", format_report(report) + "\n\n修復しますか？"):
+                self.repair_now()
+        if len(nodes) < ASYNC_MIN_NODES:
+            done(validate_map(nodes, edges))
+        else:
+            self.run_background("検証", validate_map, (nodes, edges), done)
+
+    def repair_now(self):
+        validate_map(self.nodes, self.edges, repair=True)
+        self._touch_all()
         self.auto_layout()
         self.redraw()
 
 
     # ---- drawing ----
+    @timed("redraw")
     def redraw(self):
         self.canvas.delete("all")
         self.draw_lanes()
@@ -381,13 +1697,7 @@ class QuietMapApp(tk.Tk):
             b = self.nodes.get(e["target"])
             if not a or not b:
                 continue
-            ax1, ay1, ax2, ay2 = self.node_bbox(a)
-            bx1, by1, bx2, by2 = self.node_bbox(b)
-            x1 = ax2
-            y1 = (ay1 + ay2) / 2
-            x2 = bx1
-            y2 = (by1 + by2) / 2
-            self.draw_arrow(x1, y1, x2, y2)
+            self.canvas.create_line(*edge_points(a, b), width=1, fill="#444", arrow=tk.LAST)
 
         for nid, n in self.nodes.items():
             x1, y1, x2, y2 = self.node_bbox(n)
@@ -396,7 +1706,9 @@ class QuietMapApp(tk.Tk):
             is_sel = (nid == self.selected_id)
             outline = "#1f6feb" if is_sel else "#333"
             width = 2 if is_sel else 1
-            self.canvas.create_rectangle(x1, y1, x2, y2, outline=outline, width=width, fill="white")
+            marks = self.diff_marks.get(nid)
+            fill = DIFF_COLORS.get(marks[0], "white") if marks else "white"
+            self.canvas.create_rectangle(x1, y1, x2, y2, outline=outline, width=width, fill=fill)
 
             lane = int(n.get("lane", 0))
             connector = (n.get("connector") or "").strip()
@@ -407,8 +1719,32 @@ class QuietMapApp(tk.Tk):
             self.canvas.create_text(x1 + 10, y1 + 32, anchor="nw", width=(x2 - x1 - 20), text=body, font=("Meiryo UI", 10))
 
         self.canvas.configure(scrollregion=(0, 0, max_x + 200, max_y + 200))
+        self.scroll_extent = (max_x + 200, max_y + 200)
         self.refresh_detail()
+        self._sync_minimap()
+        if self.perf_overlay:
+            self.draw_perf_overlay()
+
+    def _sync_minimap(self):
+        """前回からの変更分だけ縮小表示に反映する。"""
+        dirty, self._dirty = self._dirty, set()
+        moved, self._moved = self._moved, set()
+        full, self._dirty_all = self._dirty_all, False
+        if self.minimap is None:
+            return
+        if full:
+            self.minimap.rebuild()
+        else:
+            self.minimap.update(dirty, moved)
+            self.minimap.show_viewport()
+        self.minimap.show_selection(self.selected_id)
+
+    def _on_scroll(self, bar, *args):
+        bar.set(*args)
+        if self.minimap is not None:
+            self.minimap.show_viewport()
 
+    @timed("draw_lanes")
     def draw_lanes(self):
         # meta band
         self.canvas.create_rectangle(META_LEFT, 20, META_LEFT + META_W, 10000, fill="#f4f4f4", outline="")
@@ -424,11 +1760,15 @@ class QuietMapApp(tk.Tk):
             label = "賛成" if lane % 2 == 0 else "反対"
             self.canvas.create_text((lx0 + lx1) / 2, 30, text=f"{label}（列 {lane}）", font=("Meiryo UI", 10, "bold"))
 
-    def draw_arrow(self, x1, y1, x2, y2):
-        midx = (x1 + x2) / 2
-        self.canvas.create_line(x1, y1, midx, y1, midx, y2, x2, y2, width=1, fill="#444", arrow=tk.LAST)
+    def save_svg(self):
+        path = filedialog.asksaveasfilename(title="SVG出力", defaultextension=".svg", filetypes=[("SVG", "*.svg")])
+        if not path:
+            return
+        export_svg(self.nodes, self.edges, path)
+        messagebox.showinfo("保存", "保存しました。")
 
     # ---- events ----
+    @timed("hit_test_node")
     def hit_test_node(self, x, y):
         for nid, n in self.nodes.items():
             x1, y1, x2, y2 = self.node_bbox(n)
@@ -436,9 +1776,11 @@ class QuietMapApp(tk.Tk):
                 return nid
         return ""
 
+    @timed("event:left_click")
     def on_left_click(self, ev):
         x = self.canvas.canvasx(ev.x)
         y = self.canvas.canvasy(ev.y)
+        self.canvas.focus_set()
         nid = self.hit_test_node(x, y)
         self.selected_id = nid
         self.dragging = bool(nid)
@@ -448,6 +1790,7 @@ class QuietMapApp(tk.Tk):
             self.drag_offset = (x - x1, y - y1)
         self.redraw()
 
+    @timed("event:drag")
     def on_drag(self, ev):
         if not self.dragging or not self.selected_id:
             return
@@ -457,11 +1800,13 @@ class QuietMapApp(tk.Tk):
         if not n:
             return
         n["y"] = max(40, int(y - self.drag_offset[1]))
+        self._touch(self.selected_id)
         self.redraw()
 
     def on_release(self, ev):
         self.dragging = False
 
+    @timed("event:double_click")
     def on_double_click(self, ev):
         x = self.canvas.canvasx(ev.x)
         y = self.canvas.canvasy(ev.y)
@@ -470,6 +1815,7 @@ class QuietMapApp(tk.Tk):
             self.selected_id = nid
             self.open_editor(nid)
 
+    @timed("event:right_click")
     def on_right_click(self, ev):
         """
         Right-click context menu (追加 / Delete)
@@ -487,6 +1833,8 @@ class QuietMapApp(tk.Tk):
         lane = int(n.get("lane", 0))
         ntype = (n.get("type") or "")
 
+        if self._context_menu is None:
+            self._context_menu = tk.Menu(self, tearoff=0)
         self._context_menu.delete(0, tk.END)
 
         # issue_shift 自体からは「矢印で結ぶ追加」はしない（quiet map 方針）
@@ -523,10 +1871,14 @@ class QuietMapApp(tk.Tk):
                     m_meta.add_command(label=conn, command=lambda c=conn, pid=nid: self.add_child(pid, c))
                 self._context_menu.add_cascade(label="非賛否に追加", menu=m_meta)
 
+        self._context_menu.add_separator()
+        self._context_menu.add_command(label="コピー（部分木）", command=lambda pid=nid: self.copy_subtree(pid))
+        self._context_menu.add_command(label="ここに貼り付け", command=lambda pid=nid: self.paste_subtree(pid))
         self._context_menu.add_separator()
         self._context_menu.add_command(label="削除", command=lambda pid=nid: self.delete_node(pid))
         self._context_menu.tk_popup(ev.x_root, ev.y_root)
 
+    @timed("event:ctrl_wheel")
     def on_ctrl_wheel(self, ev):
         delta = 0
         if hasattr(ev, "delta") and ev.delta:
@@ -547,8 +1899,61 @@ class QuietMapApp(tk.Tk):
 
         for n in self.nodes.values():
             n["y"] = int(n.get("y", 0) * factor)
+        self._touch_all()
         self.redraw()
 
+    # ---- performance overlay / profiling ----
+    def toggle_perf_overlay(self):
+        self.perf_overlay = not self.perf_overlay
+        self.redraw()
+
+    def draw_perf_overlay(self):
+        """表示中の左上に、直近の計測値を重ねて描く（redraw の最後に呼ぶ）。"""
+        PERF.gauge("canvas_items", len(self.canvas.find_all()))
+        PERF.gauge("nodes", len(self.nodes))
+        PERF.gauge("edges", len(self.edges))
+
+        snap = PERF.snapshot()
+        lines = []
+        for name, st in sorted(snap["sections"].items()):
+            lines.append(f"{name:<26} {st['last_ms']:8.2f} ms  (max {st['max_ms']:.1f}, n={st['count']})")
+        lines.append("")
+        lines.append("  ".join(f"{k}: {v}" for k, v in snap["gauges"].items()))
+        if self._profiler is not None:
+            lines.append("cProfile: 計測中（F4で停止）")
+
+        x = self.canvas.canvasx(10)
+        y = self.canvas.canvasy(10)
+        item = self.canvas.create_text(x + 8, y + 8, anchor="nw", text="\n".join(lines), font=("Consolas", 9), fill="#222", tags="perf_overlay")
+        bx1, by1, bx2, by2 = self.canvas.bbox(item)
+        bg = self.canvas.create_rectangle(bx1 - 8, by1 - 8, bx2 + 8, by2 + 8, fill="#fffbe6", outline="#c9b458", tags="perf_overlay")
+        self.canvas.tag_lower(bg, item)
+
+    def dump_perf(self):
+        """計測値を JSON で保存する。"""
+        path = filedialog.asksaveasfilename(title="計測JSON保存", defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+        PERF.gauge("canvas_items", len(self.canvas.find_all()))
+        PERF.gauge("nodes", len(self.nodes))
+        PERF.gauge("edges", len(self.edges))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(PERF.snapshot(), f, ensure_ascii=False, indent=2)
+
+    def toggle_profiler(self):
+        """cProfile を開始/停止する。停止時にカレントディレクトリへ .prof を書き出す。"""
+        if self._profiler is None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler.disable()
+            path = os.path.abspath(time.strftime("quiet_map_%Y%m%d-%H%M%S.prof"))
+            self._profiler.dump_stats(path)
+            self._profiler = None
+            messagebox.showinfo("プロファイル", f"保存しました。\n{path}")
+        if self.perf_overlay:
+            self.redraw()
+
     # ---- editor ----
     def open_editor(self, nid):
         n = self.nodes.get(nid)
@@ -592,6 +1997,7 @@ class QuietMapApp(tk.Tk):
                     pl = int(self.nodes[pid].get("lane", 0))
                     n["lane"] = pl if mode == "same" else pl + 1
             n["text"] = txt.get("1.0", "end").strip()
+            self._touch(nid)
             win.destroy()
             self.auto_layout()
             self.redraw()
@@ -600,6 +2006,7 @@ class QuietMapApp(tk.Tk):
         ttk.Button(bottom, text="保存", command=save).pack(side="right", padx=(0, 8))
 
     # ---- detail ----
+    @timed("refresh_detail")
     def refresh_detail(self):
         self.detail.configure(state="normal")
         self.detail.delete("1.0", "end")
@@ -610,7 +2017,10 @@ class QuietMapApp(tk.Tk):
             self.detail.insert("end", f"ID: {n['id']}\n")
             self.detail.insert("end", f"列: {lane}（{label}）\n")
             self.detail.insert("end", f"接続詞: {n.get('connector','')}\n")
-            self.detail.insert("end", f"type: {n.get('type','')}\n\n")
+            self.detail.insert("end", f"type: {n.get('type','')}\n")
+            if self.selected_id in self.diff_marks:
+                self.detail.insert("end", f"差分: {', '.join(self.diff_marks[self.selected_id])}\n")
+            self.detail.insert("end", "\n")
             self.detail.insert("end", "本文:\n")
             self.detail.insert("end", n.get("text", ""))
         else:
@@ -622,207 +2032,87 @@ class QuietMapApp(tk.Tk):
         path = filedialog.asksaveasfilename(title="JSON保存", defaultextension=".json", filetypes=[("JSON", "*.json")])
         if not path:
             return
-        payload = {"nodes": self.nodes, "edges": self.edges, "meta": {"app": "quiet-map", "version": 1}}
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(payload, f, ensure_ascii=False, indent=2)
+        write_map_file(path, self.nodes, self.edges)
         messagebox.showinfo("保存", "保存しました。")
 
     def load_json(self):
         path = filedialog.askopenfilename(title="JSON読込", filetypes=[("JSON", "*.json")])
         if not path:
             return
+        self.load_path(path)
+
+    def load_path(self, path):
+        """path の JSON を現在のマップとして開く。成功したら True。"""
         try:
-            payload = json.loads(open(path, "r", encoding="utf-8").read())
-            if not isinstance(payload.get("nodes"), dict) or not isinstance(payload.get("edges"), list):
-                raise ValueError("nodes(dict) / edges(list) が見つかりません。")
+            payload = read_map_file(path)
+            report = validate_map(payload["nodes"], payload["edges"])
+            if report["issues"] and messagebox.askyesno("読込", format_report(report) + "\n\n修復しますか？"):
+                validate_map(payload["nodes"], payload["edges"], repair=True)
             self.nodes = payload["nodes"]
             self.edges = payload["edges"]
+            self._touch_all()
             self.selected_id = ""
+            self.diff_marks = {}
             self.auto_layout()
             self.redraw()
         except Exception as e:
             messagebox.showerror("読込エラー", str(e))
+            return False
+        return True
+
+    # ---- diff ----
+    def toggle_diff(self):
+        """旧リビジョンの JSON と現在のマップを比較し、変更ノードを色分けする（表示中なら解除）。"""
+        if self.diff_marks:
+            self.diff_marks = {}
+            self.redraw()
+            return
+        path = filedialog.askopenfilename(title="比較する旧リビジョン", filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            old = read_map_file(path)
+            changes = diff_maps(old, {"nodes": self.nodes, "edges": self.edges})
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            messagebox.showerror("読込エラー", str(e))
+            return
+        marks = {}
+        for c in changes:
+            if c["op"] != "removed":
+                marks.setdefault(c["id"], []).append(c["op"])
+        self.diff_marks = marks
+        self.redraw()
+
+        counts = Counter(c["op"] for c in changes)
+        summary = "\n".join(f"{op}: {counts[op]}" for op in ("added", "removed", "text", "connector", "lane", "parent") if counts[op])
+        messagebox.showinfo("差分", summary or "差分はありません。")
 
     # ---- paragraph export ----
     def export_paragraphs(self):
         """Generate paragraph-structured text from the current map."""
+        if len(self.nodes) < ASYNC_MIN_NODES:
+            with PERF.section("export_paragraphs"):
+                self._show_export(export_text(self.nodes))
+            return
+        t0 = time.perf_counter()
+        nodes, _ = snapshot_model(self.nodes, [])
 
-        # ---- normalize nodes to a simple list (parent_id format) ----
-        node_list = []
-        for nid, n in self.nodes.items():
-            t = (n.get("text") or "").strip()
-            if not t:
-                # allow empty nodes, but they don't add meaning in output
-                pass
-            ntype = (n.get("type") or "").strip()
-
-            # Map app-internal types to generator types
-            if ntype == "issue_shift":
-                node_type = "meta_issue_shift"
-            elif ntype in ("assumption", "definition", "question", "clarification"):
-                node_type = "meta"
-            elif ntype in ("premise", "evidence", "counter", "rebuttal", "claim"):
-                # align naming a bit
-                node_type = {
-                    "counter": "counterclaim",
-                    "rebuttal": "rebuttal",
-                    "claim": "claim",
-                }.get(ntype, ntype)
-            else:
-                # fallback: treat unknown as meta (quiet default)
-                node_type = "meta"
-
-            parent_id = (n.get("parent") or "").strip() or None
-
-            node_list.append({
-                "id": nid,
-                "parent_id": parent_id,
-                "text": t,
-                "node_type": node_type,
-                "connector": (n.get("connector") or "").strip(),
-                # order: prefer explicit, else y, else 0
-                "order": int(n.get("order", n.get("y", 0) or 0)),
-            })
-
-        def generate_structured_text(nodes):
-            # ---- index nodes ----
-            node_by_id = {n["id"]: n for n in nodes}
-            children = {n["id"]: [] for n in nodes}
-            for n in nodes:
-                pid = n.get("parent_id")
-                if pid and pid in children:
-                    children[pid].append(n["id"])
-
-            # ---- roots ----
-            roots = [n["id"] for n in nodes if not n.get("parent_id")]
-
-            def text(nid):
-                return (node_by_id[nid].get("text") or "").strip()
-
-            def ntype(nid):
-                return node_by_id[nid].get("node_type", "")
-
-            def connector(nid):
-                return node_by_id[nid].get("connector", "")
-
-            def ordered(ids):
-                return sorted(ids, key=lambda i: (node_by_id[i].get("order", 0), i))
-
-            def ensure_end(s):
-                s = (s or "").strip()
-                if not s:
-                    return ""
-                return s if s.endswith(("。", "？", "！", ".", "?", "!")) else s + "。"
-
-            # ---- same-lane cluster ----
-            def render_same_cluster(nid):
-                parts = []
-                main = ensure_end(text(nid))
-                if main:
-                    parts.append(main)
-
-                for cid in ordered(children.get(nid, [])):
-                    ct = ntype(cid)
-                    if ct not in ("premise", "evidence", "meta"):
-                        continue
-                    if ct == "meta" and ntype(cid) == "meta_issue_shift":
-                        continue
-
-                    t = ensure_end(text(cid))
-                    if not t:
-                        continue
-
-                    if ct == "premise":
-                        parts.append(f"なぜなら、{t}")
-                    elif ct == "evidence":
-                        parts.append(f"例えば、{t}")
-                    elif ct == "meta":
-                        prefix = {
-                            "前提として": "前提として、",
-                            "定義として": "定義として、",
-                            "問いとして": "ここで問いは、",
-                            "補足として": "なお、",
-                        }.get(connector(cid), "なお、")
-                        parts.append(prefix + t)
-                return "".join(parts).strip()
-
-            def render_from(nid):
-                out = []
-                nt = ntype(nid)
-
-                if nt == "meta_issue_shift":
-                    # Issue shift nodes start a new section; header is added once outside
-                    title = ensure_end(text(nid))
-                    if title:
-                        out.append(title)
-                    for c in ordered(children.get(nid, [])):
-                        out.extend(render_from(c))
-                    out.append("")
-                    return out
-
-                para = render_same_cluster(nid)
-                if para:
-                    out.append(para)
-
-                for cid in ordered(children.get(nid, [])):
-                    ct = ntype(cid)
-                    if ct == "counterclaim":
-                        t = ensure_end(text(cid))
-                        if t:
-                            out.append("しかし、" + t)
-                        # include same-lane support under this node
-                        cluster = render_same_cluster(cid)
-                        if cluster:
-                            out[-1] = cluster.replace(ensure_end(text(cid)), "しかし、" + ensure_end(text(cid))).strip()
-                        # recurse
-                        for cc in ordered(children.get(cid, [])):
-                            if ntype(cc) in ("rebuttal", "counterclaim", "meta_issue_shift", "claim"):
-                                out.extend(render_from(cc))
-
-                    elif ct == "rebuttal":
-                        t = ensure_end(text(cid))
-                        if t:
-                            out.append("それでも、" + t)
-                        cluster = render_same_cluster(cid)
-                        if cluster:
-                            out[-1] = cluster.replace(ensure_end(text(cid)), "それでも、" + ensure_end(text(cid))).strip()
-                        for cc in ordered(children.get(cid, [])):
-                            if ntype(cc) in ("rebuttal", "counterclaim", "meta_issue_shift", "claim"):
-                                out.extend(render_from(cc))
-
-                    elif ct in ("claim", "meta_issue_shift"):
-                        out.extend(render_from(cid))
-
-                return out
-
-            paragraphs = []
-            main_roots = [r for r in ordered(roots) if ntype(r) != "meta_issue_shift"]
-            issue_roots = [r for r in ordered(roots) if ntype(r) == "meta_issue_shift"]
-
-            # main discussion
-            for r in main_roots:
-                paragraphs.extend(render_from(r))
-
-            # issue shifts grouped once
-            if issue_roots:
-                paragraphs.append("")
-                paragraphs.append("【論点を変えて】")
-                for r in issue_roots:
-                    paragraphs.extend(render_from(r))
-
-
-            # clean consecutive blanks
-            cleaned = []
-            prev_blank = False
-            for p in paragraphs:
-                blank = not (p or "").strip()
-                if blank and prev_blank:
-                    continue
-                cleaned.append(p)
-                prev_blank = blank
-            return "\n\n".join(cleaned).strip()
-
-        out_text = generate_structured_text(node_list)
+        def done(out_text):
+            self._show_export(out_text)
+            PERF.record("export_paragraphs", (time.perf_counter() - t0) * 1000)  # 投入から表示まで
+        self.run_background("文章出力", export_text, (nodes,), done)
+
+    def _show_export(self, out_text):
+        t = self._export_window()
+        t.delete("1.0", "end")
+        t.insert("1.0", out_text)
+
+    def _export_window(self):
+        """文章出力ウィンドウ（初回に作り、閉じるまで使い回す）の Text を返す。"""
+        if self._export_win is not None and self._export_win.winfo_exists():
+            self._export_win.deiconify()
+            self._export_win.lift()
+            return self._export_text
 
         # ---- display output in a simple window ----
         win = tk.Toplevel(self)
@@ -834,7 +2124,6 @@ class QuietMapApp(tk.Tk):
 
         t = tk.Text(win, wrap="word")
         t.pack(fill="both", expand=True)
-        t.insert("1.0", out_text)
 
         def save_txt():
             path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text", "*.txt"), ("Markdown", "*.md"), ("All", "*.*")])
@@ -847,10 +2136,137 @@ class QuietMapApp(tk.Tk):
         ttk.Button(bar, text="TXT保存", command=save_txt).pack(side="right")
         ttk.Button(bar, text="閉じる", command=win.destroy).pack(side="right", padx=(0, 8))
 
+        self._export_win = win
+        self._export_text = t
+        return t
+
+
+# ---- CLI (headless) ----
+def cmd_diff(argv):
+    """quiet_map.py diff OLD.json NEW.json / quiet_map.py diff FOLDER"""
+    parser = argparse.ArgumentParser(prog="quiet_map.py diff", description="保存済みマップ同士の構造差分を JSON Lines で出力します。")
+    parser.add_argument("paths", nargs="+", help="比較する JSON 2つ、またはリビジョン（名前順）を並べたフォルダ")
+    parser.add_argument("--summary", action="store_true", help="変更一覧を省き、件数だけ出力する")
+    args = parser.parse_args(argv)
+
+    if len(args.paths) == 1 and os.path.isdir(args.paths[0]):
+        files = sorted(glob.glob(os.path.join(args.paths[0], "*.json")))
+    elif len(args.paths) == 2:
+        files = args.paths
+    else:
+        parser.error("JSON を2つ、またはフォルダを1つ指定してください。")
+
+    # 読めないファイルはエラーを出力して飛ばし、直前の読めたリビジョンと次を比べる
+    status = 0
+    prev = None  # (path, payload)
+    for b in files:
+        try:
+            new = read_map_file(b)
+            if prev is None:
+                prev = (b, new)
+                continue
+            a, old = prev
+            t0 = time.perf_counter()
+            changes = diff_maps(old, new)
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            print(json.dumps({"path": b, "error": str(e)}, ensure_ascii=False))
+            status = 1
+            continue
+        record = {
+            "old": a,
+            "new": b,
+            "counts": dict(Counter(c["op"] for c in changes)),
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+        }
+        if not args.summary:
+            record["changes"] = changes
+        print(json.dumps(record, ensure_ascii=False))
+        prev = (b, new)
+    return status
+
+
+def cmd_svg(argv):
+    """quiet_map.py svg MAP.json OUT.svg"""
+    parser = argparse.ArgumentParser(prog="quiet_map.py svg", description="保存済みマップ全体を SVG に書き出します（tkinter 不要）。")
+    parser.add_argument("input", help="保存済み JSON")
+    parser.add_argument("output", help="出力する SVG（- で標準出力）")
+    args = parser.parse_args(argv)
+
+    try:
+        payload = read_map_file(args.input)
+        t0 = time.perf_counter()
+        export_svg(payload["nodes"], payload["edges"], sys.stdout if args.output == "-" else args.output)
+    except (OSError, ValueError, AttributeError, TypeError) as e:
+        # SVG を標準出力に書いているときは、エラーの記録を混ぜない
+        err = sys.stderr if args.output == "-" else sys.stdout
+        print(json.dumps({"path": args.input, "error": str(e)}, ensure_ascii=False), file=err)
+        return 1
+    if args.output == "-":
+        return 0
+    print(json.dumps({
+        "input": args.input,
+        "output": args.output,
+        "nodes": len(payload["nodes"]),
+        "edges": len(payload["edges"]),
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }, ensure_ascii=False))
+    return 0
+
+
+def cmd_check(argv):
+    """quiet_map.py check MAP.json... [--repair (-o OUT | --in-place)]"""
+    parser = argparse.ArgumentParser(prog="quiet_map.py check", description="保存済みマップの整合性を検証し、結果を JSON Lines で出力します。")
+    parser.add_argument("paths", nargs="+", help="検証する JSON")
+    parser.add_argument("--repair", action="store_true", help="問題を修復して書き出す")
+    parser.add_argument("-o", "--output", help="修復結果の出力先（入力が1つのとき）")
+    parser.add_argument("--in-place", action="store_true", help="修復結果で入力ファイルを上書きする")
+    args = parser.parse_args(argv)
+    if args.repair and not (args.in_place or args.output):
+        parser.error("--repair には -o OUT か --in-place が必要です。")
+    if args.output and len(args.paths) != 1:
+        parser.error("-o は入力が1つのときだけ使えます。")
+
+    status = 0
+    for path in args.paths:
+        try:
+            payload = read_map_file(path)
+            report = validate_map(payload["nodes"], payload["edges"], repair=args.repair)
+            report["path"] = path
+            if args.repair:
+                out = args.output or path
+                if report["issues"] or out != path:
+                    write_map_file(out, payload["nodes"], payload["edges"])
+                report["output"] = out
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            print(json.dumps({"path": path, "error": str(e)}, ensure_ascii=False))
+            status = 1
+            continue
+        if not args.repair and report["issues"]:
+            status = 1
+        print(json.dumps(report, ensure_ascii=False))
+    return status
+
+
+CLI_COMMANDS = {
+    "diff": cmd_diff,
+    "svg": cmd_svg,
+    "check": cmd_check,
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in CLI_COMMANDS:
+        return CLI_COMMANDS[argv[0]](argv[1:])
 
-def main():
-    QuietMapApp().mainloop()
+    parser = argparse.ArgumentParser(prog="quiet_map.py", description=f"quiet map（サブコマンド: {', '.join(CLI_COMMANDS)}）")
+    parser.add_argument("path", nargs="?", help="起動時に開く JSON（省略時はサンプル）")
+    args = parser.parse_args(argv)
+    if tk is None:
+        parser.error("GUI には tkinter が必要です。")
+    QuietMapApp(args.path).mainloop()
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+quiet_map_bench.py
+
+quiet_map.py の主要な処理を、合成マップ（generate_map）で規模別に計測するベンチマーク。
+
+計測対象: auto_layout / hit_test_node / redraw / export_paragraphs（文章生成）/
+          save_json / load_json（アプリでの読込〜再描画）/ delete_node / minimap_update（1ノード編集分の差分更新）/
+          validate_map（読込時の整合性検証）
+redraw はディスプレイ不要の NullCanvas（Canvas の代役）で計測します。
+
+--startup を付けると、起動時間（コールドスタート）も別プロセスで計測します
+（要ディスプレイ）。比較するのは
+    cold_start_eager       : 旧来の起動（--startup-baseline の版で、サンプル生成・描画 →
+                             ファイル読込 → 初回表示）
+    cold_start_first_paint : 現在の起動（ファイル指定時）で初回表示まで
+    cold_start_ready       : 現在の起動でマップの描画完了まで
+
+結果は JSON Lines（既定: bench_results.jsonl）に追記し、前回の結果と比べて
+遅くなったものに REGRESSION と表示します。
+
+使い方:
+    python quiet_map_bench.py                      # 100 / 1k / 10k / 100k
+    python quiet_map_bench.py --sizes 100,1000000  # 1M まで
+    python quiet_map_bench.py --only redraw,auto_layout
+    python quiet_map_bench.py --startup --only none
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import quiet_map as qm
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+DEFAULT_RESULTS = "bench_results.jsonl"
+REGRESSION_RATIO = 1.25  # 前回比でこれ以上遅ければ REGRESSION
+
+
+class NullCanvas:
+    """tk.Canvas の代役。描画命令を数えるだけで何も描かない。"""
+
+    def __init__(self):
+        self.items = 0
+
+    def _create(self, *args, **kw):
+        self.items += 1
+        return self.items
+
+    create_rectangle = create_text = create_line = _create
+
+    def delete(self, *args):
+        self.items = 0 if args == ("all",) else max(0, self.items - 1)
+
+    def configure(self, **kw):
+        pass
+
+    def coords(self, *args):
+        pass
+
+    def itemconfigure(self, *args, **kw):
+        pass
+
+    def scale(self, *args):
+        pass
+
+    def tag_raise(self, *args):
+        pass
+
+    def tag_lower(self, *args):
+        pass
+
+    def xview(self):
+        return 0.0, 1.0
+
+    def yview(self):
+        return 0.0, 1.0
+
+    def canvasx(self, x):
+        return x
+
+    def canvasy(self, y):
+        return y
+
+
+class NullText:
+    """tk.Text（詳細パネル）の代役。"""
+
+    def configure(self, **kw):
+        pass
+
+    def delete(self, *args):
+        pass
+
+    def insert(self, *args):
+        pass
+
+
+def make_app(payload):
+    """Tk を起動せずに QuietMapApp のモデル/描画メソッドを使えるインスタンスを作る。"""
+    app = object.__new__(qm.QuietMapApp)
+    app._init_state()
+    app.canvas = NullCanvas()
+    app.detail = NullText()
+    app.nodes = payload["nodes"]
+    app.edges = payload["edges"]
+    app.auto_layout()
+    return app
+
+
+def timeit(fn, repeat=3):
+    """fn を repeat 回実行し、最短時間（秒）を返す。"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+# ---- benchmarks (each: size -> seconds) ----
+def bench_auto_layout(payload):
+    app = make_app(payload)
+    return timeit(app.auto_layout)
+
+
+def bench_hit_test_node(payload, probes=100):
+    app = make_app(payload)
+    rng = random.Random(0)
+    pts = [(rng.uniform(0, app.lane_to_x(4)), rng.uniform(0, 90 * len(app.nodes) / 4)) for _ in range(probes)]
+
+    def run():
+        for x, y in pts:
+            app.hit_test_node(x, y)
+    return timeit(run) / probes
+
+
+def bench_redraw(payload):
+    app = make_app(payload)
+    return timeit(app.redraw)
+
+
+def bench_export_paragraphs(payload):
+    app = make_app(payload)
+    return timeit(lambda: qm.generate_structured_text(qm.paragraph_nodes(app.nodes)))
+
+
+def bench_save_json(payload):
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        return timeit(lambda: qm.write_map_file(path, payload["nodes"], payload["edges"]))
+    finally:
+        os.remove(path)
+
+
+def bench_load_json(payload):
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        qm.write_map_file(path, payload["nodes"], payload["edges"])
+        app = make_app(qm.sample_map())
+        return timeit(lambda: app.load_path(path))  # 読込・検証・整列・再描画まで
+    finally:
+        os.remove(path)
+
+
+def bench_delete_node(payload):
+    # 毎回新しいマップで、葉に近いノード（最後に作られた賛否ノード）を削除する
+    best = float("inf")
+    for _ in range(3):
+        app = make_app(json.loads(json.dumps(payload)))
+        nid = next(i for i in reversed(list(app.nodes)) if int(app.nodes[i]["lane"]) != qm.LANE_META)
+        t0 = time.perf_counter()
+        app.delete_node(nid)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_minimap_update(payload, edits=5):
+    """1回の編集（子の追加 → 編集画面で保存 → 削除）で縮小表示の差分更新にかかる時間。
+
+    auto_layout が動かしたノードも含めて、実際の編集と同じ変更ノードを渡す。
+    戻り値は Minimap.update 1回あたりの平均。
+    """
+    app = make_app(payload)
+    app.minimap = qm.Minimap(app, NullCanvas())
+    app.redraw()  # 初回は全体を作る
+    ids = [i for i in app.nodes if int(app.nodes[i]["lane"]) != qm.LANE_META]
+    parents = ids[len(ids) // 4::max(1, len(ids) // (2 * edits))][:edits]  # 列の上の方（下に多くのノードがある位置）
+
+    qm.PERF.reset()
+    for pid in parents:
+        app.add_child(pid, "なぜなら")
+        nid = app.selected_id
+        app.nodes[nid]["text"] = "編集後の本文" * 8  # 編集画面の保存と同じ手順（Tk 抜き）
+        app._touch(nid)
+        app.auto_layout()
+        app._sync_minimap()
+        app.delete_node(nid)
+    st = qm.PERF.snapshot()["sections"]["minimap_update"]
+    return st["total_ms"] / 1000 / st["count"]
+
+
+def bench_validate_map(payload):
+    return timeit(lambda: qm.validate_map(payload["nodes"], payload["edges"]))
+
+
+BENCHMARKS = {
+    "auto_layout": bench_auto_layout,
+    "hit_test_node": bench_hit_test_node,
+    "redraw": bench_redraw,
+    "export_paragraphs": bench_export_paragraphs,
+    "save_json": bench_save_json,
+    "load_json": bench_load_json,
+    "delete_node": bench_delete_node,
+    "minimap_update": bench_minimap_update,
+    "validate_map": bench_validate_map,
+}
+
+
+# ---- cold start (subprocess, needs a display) ----
+# 比較元（eager）: 遅延起動を入れる前の版。git から quiet_map.py を取り出して起動する
+STARTUP_BASELINE = "2579e36^"
+
+STARTUP_SCRIPT = r"""
+import sys, time, json
+t0 = time.perf_counter()
+import quiet_map as qm
+mode, path = sys.argv[1], sys.argv[2]
+out = {}
+if mode == "eager":
+    # 旧来の起動: コンストラクタでサンプルを作って描き、続けてファイルを読み込んでから表示
+    app = qm.QuietMapApp()
+    if getattr(app, "_startup_job", None) is not None:  # 比較元が取り出せず現行版で代用したとき
+        app.after_cancel(app._startup_job)
+        app._startup_job = None
+        app.reset_to_sample()
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    app.nodes = payload["nodes"]
+    app.edges = payload["edges"]
+    if hasattr(app, "_touch_all"):
+        app._touch_all()
+    app.selected_id = ""
+    app.auto_layout()
+    app.redraw()
+    app.update()  # 最初の表示（旧来はここで初めて画面が出る）
+    out["cold_start_eager"] = time.perf_counter() - t0
+else:
+    # update() は読込まで進めてしまうので、初回表示の時刻はアプリ側
+    # （_initial_load の冒頭、最初の Expose の後）で記録したものを使う
+    app = qm.QuietMapApp(path)
+    while not app.ready:
+        app.update()
+    out["cold_start_first_paint"] = app.first_paint_at - t0
+    out["cold_start_ready"] = time.perf_counter() - t0
+app.destroy()
+print(json.dumps(out))
+"""
+
+
+def baseline_source(rev, dest):
+    """rev 時点の quiet_map.py を dest に書き出す。取り出せなければ False。"""
+    try:
+        out = subprocess.run(["git", "show", f"{rev}:quiet_map.py"], capture_output=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    if out.returncode != 0:
+        return False
+    with open(os.path.join(dest, "quiet_map.py"), "wb") as f:
+        f.write(out.stdout)
+    return True
+
+
+def bench_cold_start(payload, baseline=STARTUP_BASELINE):
+    """起動時間を別プロセスで計測する。ディスプレイが無ければ None。"""
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    with tempfile.TemporaryDirectory() as old_dir:
+        eager_cwd = old_dir if baseline and baseline_source(baseline, old_dir) else here
+        try:
+            qm.write_map_file(path, payload["nodes"], payload["edges"])
+            for mode, cwd in (("eager", eager_cwd), ("lazy", here)):
+                proc = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, mode, path], capture_output=True, text=True, cwd=cwd)
+                if proc.returncode != 0:
+                    return None
+                results.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+        finally:
+            os.remove(path)
+    return results
+
+
+# ---- results ----
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def load_previous(path):
+    """結果ファイルから、(bench, size) ごとの直近の記録を返す。"""
+    prev = {}
+    if not os.path.exists(path):
+        return prev
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                r = json.loads(line)
+            except ValueError:
+                continue
+            prev[(r.get("bench"), r.get("size"))] = r
+    return prev
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="quiet map の規模別ベンチマーク")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="ノード数（カンマ区切り）")
+    parser.add_argument("--only", default="", help="実行するベンチマーク名（カンマ区切り）")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="結果を追記する JSON Lines ファイル")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-save", action="store_true", help="結果を保存しない")
+    parser.add_argument("--startup", action="store_true", help="起動時間も計測する（要ディスプレイ）")
+    parser.add_argument("--startup-baseline", default=STARTUP_BASELINE,
+                        help="起動時間の比較元にする git リビジョン（空なら現行版で旧来の起動を再現）")
+    args = parser.parse_args(argv)
+
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+    names = [x.strip() for x in args.only.split(",") if x.strip()] or list(BENCHMARKS)
+    if names == ["none"]:
+        names = []
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    prev = load_previous(args.results)
+    run_info = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+    records = []
+
+    def report(name, size, sec):
+        records.append(dict(run_info, bench=name, size=size, seconds=sec))
+        note = ""
+        old = prev.get((name, size))
+        if old and old.get("seconds"):
+            ratio = sec / old["seconds"]
+            note = f"  x{ratio:.2f} vs {old.get('commit') or old.get('timestamp')}"
+            if ratio >= REGRESSION_RATIO:
+                note += "  REGRESSION"
+        print(f"{name:<22} {size:>8}  {sec * 1000:10.3f} ms{note}", flush=True)
+
+    for size in sizes:
+        payload = qm.generate_map(size, seed=args.seed)
+        for name in names:
+            report(name, size, BENCHMARKS[name](payload))
+        if args.startup:
+            startup = bench_cold_start(payload, args.startup_baseline)
+            if startup is None:
+                print(f"{'cold_start':<22} {size:>8}  skipped (no display?)", flush=True)
+                continue
+            for name, sec in sorted(startup.items()):
+                report(name, size, sec)
+
+    if not args.no_save:
+        with open(args.results, "a", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())